@@ -1,10 +1,28 @@
 import logging
+import multiprocessing
+from logging.handlers import QueueHandler, QueueListener
 
 from icpc_mexico_scoreboard.scoreboard_notifier import ScoreboardNotifier
 
 
+def _log_in_background() -> QueueListener:
+    """Moves the root handlers to a background thread, so writing logs doesn't block the event loop."""
+    root_logger = logging.getLogger()
+    # The processes forked to parse the scoreboards inherit the QueueHandler, so they need a queue that reaches
+    # the listener in this process, or their logs would be lost
+    log_queue: "multiprocessing.Queue[logging.LogRecord]" = multiprocessing.Queue()
+    listener = QueueListener(log_queue, *root_logger.handlers, respect_handler_level=True)
+    root_logger.handlers = [QueueHandler(log_queue)]
+    listener.start()
+    return listener
+
+
 async def start() -> None:
     logging.basicConfig(level=logging.INFO)
     logging.getLogger('icpc_mexico_scoreboard').setLevel(logging.DEBUG)
-    scoreboard = ScoreboardNotifier()
-    await scoreboard.start_running()
+    log_listener = _log_in_background()
+    try:
+        scoreboard = ScoreboardNotifier()
+        await scoreboard.start_running()
+    finally:
+        log_listener.stop()
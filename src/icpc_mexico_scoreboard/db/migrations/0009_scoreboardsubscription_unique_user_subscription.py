@@ -0,0 +1,29 @@
+# Generated by Django 4.2.1 on 2026-10-15 18:12
+
+from django.db import migrations, models
+
+
+def delete_duplicate_subscriptions(apps, schema_editor):
+    ScoreboardSubscription = apps.get_model('db', 'ScoreboardSubscription')
+    seen = set()
+    for subscription in ScoreboardSubscription.objects.filter(subscription__isnull=False).order_by('pk'):
+        key = (subscription.user_id, subscription.subscription)
+        if key in seen:
+            subscription.delete()
+        else:
+            seen.add(key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0008_scoreboardsubscription_top_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_subscriptions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='scoreboardsubscription',
+            constraint=models.UniqueConstraint(fields=('user', 'subscription'), name='unique_user_subscription'),
+        ),
+    ]
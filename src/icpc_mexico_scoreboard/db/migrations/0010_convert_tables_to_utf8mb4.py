@@ -0,0 +1,25 @@
+# Generated by Django 4.2.1 on 2026-10-15 19:02
+
+from django.db import migrations
+
+
+def convert_to_utf8mb4(apps, schema_editor):
+    # Databases created with utf8 can't store four-byte characters like emojis, which strict mode turns into errors
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    quote_name = schema_editor.quote_name
+    database_name = schema_editor.connection.settings_dict['NAME']
+    schema_editor.execute(f'ALTER DATABASE {quote_name(database_name)} CHARACTER SET utf8mb4')
+    for model in apps.get_app_config('db').get_models():
+        schema_editor.execute(f'ALTER TABLE {quote_name(model._meta.db_table)} CONVERT TO CHARACTER SET utf8mb4')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0009_scoreboardsubscription_unique_user_subscription'),
+    ]
+
+    operations = [
+        migrations.RunPython(convert_to_utf8mb4, migrations.RunPython.noop),
+    ]
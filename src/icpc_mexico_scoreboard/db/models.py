@@ -45,5 +45,10 @@ class ScoreboardSubscription(models.Model):
     subscription = models.CharField(max_length=100, null=True)
     top = models.IntegerField(null=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "subscription"], name="unique_user_subscription"),
+        ]
+
 
 # TODO: Add Scoreboard and Team models
@@ -1,6 +1,9 @@
+import asyncio
 import time
-from typing import Set, Optional
+from concurrent.futures import ProcessPoolExecutor
+from typing import Set, Optional, Tuple, Union
 
+import httpx
 import requests
 from selenium import webdriver
 from selenium.common import TimeoutException, UnexpectedAlertPresentException
@@ -31,6 +34,20 @@ def _get_webdriver() -> webdriver.Chrome:
     return _webdriver
 
 
+def _get_team_rank_key(team: ParsedBocaScoreboardTeam) -> Tuple[int, str]:
+    return team.place, team.name.lower()
+
+
+def _is_rpc_scoreboard(scoreboard_url: str) -> bool:
+    return "redprogramacioncompetitiva" in scoreboard_url
+
+
+def _needs_webdriver(scoreboard_url: str) -> bool:
+    return ('animeitor' in scoreboard_url
+            or _is_rpc_scoreboard(scoreboard_url)
+            or scoreboard_url.startswith("file://"))
+
+
 def parse_boca_scoreboard(scoreboard_url: str) -> ParsedBocaScoreboard:
     """Parses the scoreboard of a BOCA contest."""
     if 'animeitor' in scoreboard_url:
@@ -38,13 +55,37 @@ def parse_boca_scoreboard(scoreboard_url: str) -> ParsedBocaScoreboard:
     else:
         scoreboard = _parse_boca_scoreboard(scoreboard_url)
 
-    scoreboard.teams.sort(key=lambda t: (t.place, t.name.lower()))
+    scoreboard.teams.sort(key=_get_team_rank_key)
     return scoreboard
 
 
+def parse_boca_scoreboard_html(scoreboard_url: str, scoreboard_html: bytes) -> ParsedBocaScoreboard:
+    """Parses the scoreboard of a BOCA contest from its already fetched HTML."""
+    scoreboard = _parse_boca_scoreboard_html(scoreboard_url, scoreboard_html)
+    scoreboard.teams.sort(key=_get_team_rank_key)
+    return scoreboard
+
+
+async def parse_boca_scoreboard_async(client: httpx.AsyncClient, scoreboard_url: str) -> ParsedBocaScoreboard:
+    """Parses the scoreboard of a BOCA contest in another process, fetching it with the given client if possible.
+
+    Reusing the client keeps the connection to the scoreboard open between parsings.
+    """
+    scoreboard_html = None
+    if not _needs_webdriver(scoreboard_url):
+        response = await client.get(scoreboard_url)
+        scoreboard_html = response.content
+
+    with ProcessPoolExecutor() as executor:
+        if scoreboard_html is None:
+            future = executor.submit(parse_boca_scoreboard, scoreboard_url)
+        else:
+            future = executor.submit(parse_boca_scoreboard_html, scoreboard_url, scoreboard_html)
+        return await asyncio.wrap_future(future)
+
+
 def _parse_boca_scoreboard(scoreboard_url: str, wait_for_session: bool = False) -> ParsedBocaScoreboard:
-    is_rpc = "redprogramacioncompetitiva" in scoreboard_url
-    mexico_only = is_rpc or 'naquadah' in scoreboard_url
+    is_rpc = _is_rpc_scoreboard(scoreboard_url)
     if not wait_for_session and not is_rpc and not scoreboard_url.startswith("file://"):
         response = requests.get(scoreboard_url)
         scoreboard_html = response.content
@@ -79,6 +120,12 @@ def _parse_boca_scoreboard(scoreboard_url: str, wait_for_session: bool = False)
         scoreboard_html = driver.page_source
         driver.quit()
 
+    return _parse_boca_scoreboard_html(scoreboard_url, scoreboard_html)
+
+
+def _parse_boca_scoreboard_html(scoreboard_url: str, scoreboard_html: Union[str, bytes]) -> ParsedBocaScoreboard:
+    is_rpc = _is_rpc_scoreboard(scoreboard_url)
+    mexico_only = is_rpc or 'naquadah' in scoreboard_url
     html = BeautifulSoup(scoreboard_html, "html.parser")
     table = html.find(id="myscoretable")
     if not table:
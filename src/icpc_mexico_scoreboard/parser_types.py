@@ -6,7 +6,7 @@ class NotAScoreboardError(Exception):
     pass
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ParsedBocaScoreboardProblem:
     name: str
     tries: int
@@ -14,7 +14,7 @@ class ParsedBocaScoreboardProblem:
     is_solved: bool
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ParsedBocaScoreboardTeam:
     name: str
     place: int
@@ -47,6 +47,6 @@ class ParsedBocaScoreboardTeam:
         return False
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ParsedBocaScoreboard:
     teams: List[ParsedBocaScoreboardTeam]
@@ -2,18 +2,21 @@ import asyncio
 import html
 import logging
 import math
+import time
 from collections import defaultdict
-from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import List, Dict, Set, Optional, Iterable
+from itertools import islice
+from typing import List, Dict, Set, Optional, Iterable, FrozenSet, Tuple
 
+import httpx
 from django import db
 from django.db.models import QuerySet
 
 from icpc_mexico_scoreboard.db.models import ScoreboardUser, ScoreboardSubscription, Contest, ScoreboardStatus
 from icpc_mexico_scoreboard.db.queries import get_repechaje_teams_that_have_advanced
 from icpc_mexico_scoreboard.db.util import close_connection
-from icpc_mexico_scoreboard.parser import parse_boca_scoreboard
+from icpc_mexico_scoreboard.parser import parse_boca_scoreboard_async
 from icpc_mexico_scoreboard.parser_types import ParsedBocaScoreboard, ParsedBocaScoreboardTeam, NotAScoreboardError
 from icpc_mexico_scoreboard.telegram_notifier import TelegramNotifier, TelegramUser
 
@@ -23,13 +26,48 @@ _SCOREBOARD_RELEASE_TIMEOUT = timedelta(days=5)
 
 _SCOREBOARD_PRE_START_TIME = timedelta(hours=2)
 
+_SCOREBOARD_PARSING_INTERVAL_SECONDS = 60
+
+_SCOREBOARD_REQUEST_TIMEOUT_SECONDS = 30
+
 _MAX_NOTIFICATION_TEAM_COUNT = 30
 
 _USE_NEW_NOTIFICATION_FORMAT = True
 
+_MAX_SUBSCRIPTION_LENGTH = ScoreboardSubscription._meta.get_field("subscription").max_length
+
+
+@dataclass(frozen=True, slots=True)
+class _TeamState:
+    """What is kept from a parsed team to find its changes in the next parsing."""
+    place: int
+    total_solved: int
+    total_penalty: int
+    solved_names: FrozenSet[str]
+    tries: Tuple[int, ...]
+
+
+class _NotificationBatch:
+    """Messages for each chat found during a scoreboard parsing, sent together once it's done."""
+    _messages: Dict[int, List[str]]
+
+    def __init__(self) -> None:
+        self._messages = defaultdict(list)
+
+    def add(self, chat_id: int, message: str) -> None:
+        self._messages[chat_id].append(message)
+
+    async def flush(self, telegram: TelegramNotifier) -> None:
+        # Queue everything at once, so each chat's messages are coalesced into as few as possible
+        for chat_id, messages in self._messages.items():
+            for message in messages:
+                await telegram.send_message(message, chat_id)
+        self._messages.clear()
+
 
 def _format_code(code: str) -> str:
-    return f"<code>{html.escape(code)}</code>"
+    # Telegram's HTML only requires escaping &, < and >, so skip the quotes
+    return f"<code>{html.escape(code, quote=False)}</code>"
 
 
 def _concat_paragraphs(a: Optional[str], b: Optional[str]) -> str:
@@ -118,21 +156,21 @@ async def _get_users_with_subscriptions() -> List[ScoreboardUser]:
     return await _query_to_list(ScoreboardUser.objects.filter(pk__in=user_ids))
 
 
-async def _get_last_contest() -> Optional[Contest]:
-    return await Contest.objects.filter(starts_at__lte=datetime.utcnow()).order_by("starts_at").alast()
+async def _get_last_contest(now: datetime) -> Optional[Contest]:
+    return await Contest.objects.filter(starts_at__lte=now).order_by("starts_at").alast()
 
 
-async def _get_next_contest() -> Optional[Contest]:
-    return await Contest.objects.filter(starts_at__gt=datetime.utcnow()).order_by("starts_at").afirst()
+async def _get_next_contest(now: datetime) -> Optional[Contest]:
+    return await Contest.objects.filter(starts_at__gt=now).order_by("starts_at").afirst()
 
 
-async def _get_current_contest() -> Optional[Contest]:
-    last_contest = await _get_last_contest()
-    next_contest = await _get_next_contest()
+async def _get_current_contest(now: datetime) -> Optional[Contest]:
+    last_contest = await _get_last_contest(now)
+    next_contest = await _get_next_contest(now)
     if last_contest:
         if not ScoreboardStatus.is_finished(last_contest.scoreboard_status):
             return last_contest
-        if next_contest and next_contest.starts_at < datetime.utcnow() + _SCOREBOARD_PRE_START_TIME:
+        if next_contest and next_contest.starts_at < now + _SCOREBOARD_PRE_START_TIME:
             # Last contest has finished (whatever state) and the next one is about to start, so use that instead
             return next_contest
         if last_contest.scoreboard_status == ScoreboardStatus.ARCHIVED:
@@ -145,10 +183,12 @@ async def _get_current_contest() -> Optional[Contest]:
     return next_contest
 
 
-async def _parse_scoreboard(scoreboard_url: str) -> ParsedBocaScoreboard:
-    with ProcessPoolExecutor() as executor:
-        future = executor.submit(parse_boca_scoreboard, scoreboard_url)
-        return await asyncio.wrap_future(future)
+def _matches_any_query(team_name: str, queries: Iterable[str]) -> bool:
+    team_name = team_name.lower()
+    for query in queries:
+        if query.lower().strip() in team_name:
+            return True
+    return False
 
 
 def _get_top_teams(scoreboard: Optional[ParsedBocaScoreboard], top: int) -> List[ParsedBocaScoreboardTeam]:
@@ -161,14 +201,46 @@ def _get_top_teams(scoreboard: Optional[ParsedBocaScoreboard], top: int) -> List
     ]
 
 
+def _get_top_team_names(team_states: Dict[str, _TeamState], top: int) -> List[str]:
+    return [
+        team_name
+        for team_name, team_state in islice(team_states.items(), top)
+        if team_state.total_solved > 0
+    ]
+
+
+def _get_team_states(scoreboard: ParsedBocaScoreboard) -> Dict[str, _TeamState]:
+    return {
+        team.name: _TeamState(
+            place=team.place,
+            total_solved=team.total_solved,
+            total_penalty=team.total_penalty,
+            solved_names=frozenset(problem.name for problem in team.problems if problem.is_solved),
+            tries=tuple(problem.tries for problem in team.problems),
+        )
+        for team in scoreboard.teams
+    }
+
+
 class ScoreboardNotifier:
     _telegram: Optional[TelegramNotifier] = None
+    # Shared by all the parsings so the connection to the scoreboard is reused
+    _http_client: Optional[httpx.AsyncClient] = None
     # TODO: Get from DB
-    _previous_scoreboard: Optional[ParsedBocaScoreboard] = None
+    # Only the state of the previous teams is kept, in scoreboard order, as it is all that is needed to diff
+    _previous_team_states: Optional[Dict[str, _TeamState]] = None
     _scoreboard: Optional[ParsedBocaScoreboard] = None
+    # State of the teams in the current scoreboard, built once per parsing to become the previous one in the next
+    _team_states: Optional[Dict[str, _TeamState]] = None
+    # Summaries of the teams in the current scoreboard, rendered once per parsing instead of once per user
+    _team_summaries: Dict[str, str]
+
+    def __init__(self) -> None:
+        self._team_summaries = {}
 
     async def start_running(self) -> None:
         logger.debug("Starting up")
+        self._http_client = httpx.AsyncClient(timeout=_SCOREBOARD_REQUEST_TIMEOUT_SECONDS, follow_redirects=True)
         self._telegram = TelegramNotifier()
         await self._telegram.start_running(
             _get_status_callback=self._get_status,
@@ -187,17 +259,28 @@ class ScoreboardNotifier:
     async def _start_parsing_scoreboards(self) -> None:
         logger.debug("Starting to parse scoreboards")
         while True:
+            # Use a monotonic clock to keep the interval steady even if the wall clock jumps
+            started_at = time.monotonic()
+            batch = _NotificationBatch()
             try:
                 await close_connection()
-                await self._parse_current_scoreboard()
+                await self._parse_current_scoreboard(batch)
             except Exception:
-                logging.exception("Unexpected error")
+                logger.exception("Unexpected error")
+            # Whatever was found before an error is still worth sending
+            try:
+                await batch.flush(self._telegram)
+            except Exception:
+                logger.exception("Unexpected error while sending the notifications")
 
-            await asyncio.sleep(60)
+            elapsed_seconds = time.monotonic() - started_at
+            await asyncio.sleep(max(0.0, _SCOREBOARD_PARSING_INTERVAL_SECONDS - elapsed_seconds))
 
-    async def _parse_current_scoreboard(self) -> None:
+    async def _parse_current_scoreboard(self, batch: _NotificationBatch) -> None:
         logger.debug("Looking for a contest to parse")
-        contest = await _get_current_contest()
+        # Use the same time during the whole parsing, so the contest transitions are consistent
+        now = datetime.utcnow()
+        contest = await _get_current_contest(now)
         if not contest:
             logger.info("No contest is actively running or soon to run")
             return
@@ -210,7 +293,6 @@ class ScoreboardNotifier:
             logger.info("No contest is actively running or soon to run")
             return
 
-        now = datetime.utcnow()
         if contest.starts_at > now:
             # No need to put in work when the contest has not started and consume resources
             logger.info(f"Contest {contest.name} has not started yet, nothing will be parsed")
@@ -222,7 +304,7 @@ class ScoreboardNotifier:
             if contest.scoreboard_status != ScoreboardStatus.VISIBLE:
                 contest.scoreboard_status = ScoreboardStatus.VISIBLE
                 await contest.asave()
-                await self._notify_all_subscribed_users(f"El concurso <i>{contest.name}</i> ha iniciado")
+                await self._notify_all_subscribed_users(f"El concurso <i>{contest.name}</i> ha iniciado", batch)
         elif contest.ends_at > now:
             # Not yet finished
             if contest.scoreboard_status != ScoreboardStatus.FROZEN:
@@ -230,7 +312,8 @@ class ScoreboardNotifier:
                 await contest.asave()
                 await self._notify_all_subscribed_users(
                     f"El concurso <i>{contest.name}</i> se ha congelado, "
-                    f"pero algunos envíos pueden estar pendientes de evaluarse")
+                    f"pero algunos envíos pueden estar pendientes de evaluarse",
+                    batch)
         elif contest.ends_at + _SCOREBOARD_RELEASE_TIMEOUT < now:
             # Expire the contest if it ended a long time ago as it was never released
             if contest.scoreboard_status != ScoreboardStatus.RELEASED:
@@ -245,17 +328,18 @@ class ScoreboardNotifier:
             await contest.asave()
             await self._notify_all_subscribed_users(
                 f"El concurso <i>{contest.name}</i> ha terminado y, "
-                f"cuando los resultados finales se liberen, serás notificado del scoreboard final")
+                f"cuando los resultados finales se liberen, serás notificado del scoreboard final",
+                batch)
 
         try:
-            scoreboard = await _parse_scoreboard(contest.scoreboard_url)
+            scoreboard = await parse_boca_scoreboard_async(self._http_client, contest.scoreboard_url)
         except NotAScoreboardError:
             logger.info(f"El concurso {contest.name} no ha iniciado")
             scoreboard = None
 
         if not scoreboard:
-            self._previous_scoreboard = None
-            self._scoreboard = None
+            self._previous_team_states = None
+            self._set_scoreboard(None)
             if ScoreboardStatus.is_finished(contest.scoreboard_status):
                 # There is no scoreboard so it must have been archived
                 contest.scoreboard_status = ScoreboardStatus.ARCHIVED
@@ -263,26 +347,36 @@ class ScoreboardNotifier:
             return
 
         # TODO: Store scoreboard in DB
-        self._previous_scoreboard = self._scoreboard
-        self._scoreboard = scoreboard
+        self._previous_team_states = self._team_states
+        self._set_scoreboard(scoreboard)
         if (contest.scoreboard_status == ScoreboardStatus.WAITING_TO_BE_RELEASED
-                and self._previous_scoreboard
-                and self._previous_scoreboard != self._scoreboard):
+                and self._previous_team_states is not None
+                and self._previous_team_states != self._team_states):
             # A scoreboard change means it was released
             contest.scoreboard_status = ScoreboardStatus.RELEASED
             await contest.asave()
             await self._notify_all_subscribed_users(
-                f"Los resultados finales del concurso <i>{contest.name}</i> han sido liberados")
-            await self._notify_scoreboard_to_all_users()
+                f"Los resultados finales del concurso <i>{contest.name}</i> han sido liberados",
+                batch)
+            await self._notify_scoreboard_to_all_users(now, batch)
             return
 
-        await self._notify_rank_updates(contest)
+        await self._notify_rank_updates(contest, now, batch)
+
+    def _set_scoreboard(self, scoreboard: Optional[ParsedBocaScoreboard]) -> None:
+        self._scoreboard = scoreboard
+        self._team_states = _get_team_states(scoreboard) if scoreboard else None
+        self._team_summaries = {}
+        if scoreboard:
+            self._team_summaries = {team.name: self._get_team_summary(team) for team in scoreboard.teams}
 
     async def stop_running(self) -> None:
         await self._telegram.stop_running()
+        if self._http_client:
+            await self._http_client.aclose()
 
-    async def _notify_if_no_scoreboard(self, telegram_user: TelegramUser) -> bool:
-        contest = await _get_current_contest()
+    async def _notify_if_no_scoreboard(self, telegram_user: TelegramUser, now: datetime) -> bool:
+        contest = await _get_current_contest(now)
         if not contest:
             await self._telegram.send_message("No hay concurso actual", telegram_user.chat_id)
             return True
@@ -298,15 +392,14 @@ class ScoreboardNotifier:
     async def _get_status(self, telegram_user: TelegramUser) -> None:
         db.close_old_connections()
 
-        agenda = await self._compute_status()
+        agenda = await self._compute_status(datetime.utcnow())
         await self._telegram.send_message(agenda, chat_id=telegram_user.chat_id)
 
-    async def _compute_status(self) -> str:
-        last_contest = await _get_last_contest()
-        now = datetime.utcnow()
-        next_contest = await _get_next_contest()
+    async def _compute_status(self, now: datetime) -> str:
+        last_contest = await _get_last_contest(now)
+        next_contest = await _get_next_contest(now)
         if (next_contest and (
-                next_contest.starts_at < datetime.utcnow() + _SCOREBOARD_PRE_START_TIME
+                next_contest.starts_at < now + _SCOREBOARD_PRE_START_TIME
                 or (last_contest and last_contest.scoreboard_status == ScoreboardStatus.ARCHIVED)
         )):
             time_to_start = _get_time_delta_as_human(now, next_contest.starts_at)
@@ -354,7 +447,8 @@ class ScoreboardNotifier:
     async def _get_top(self, telegram_user: TelegramUser, top_n: Optional[int]) -> None:
         db.close_old_connections()
 
-        if await self._notify_if_no_scoreboard(telegram_user):
+        now = datetime.utcnow()
+        if await self._notify_if_no_scoreboard(telegram_user, now):
             return
 
         if top_n is None or top_n <= 0:
@@ -363,7 +457,7 @@ class ScoreboardNotifier:
 
         top_teams = _get_top_teams(self._scoreboard, top_n)
         top_rank = self._get_current_rank(top_teams)
-        advancing_rank = await self._get_advancing_rank()
+        advancing_rank = await self._get_advancing_rank(now)
         message = _concat_paragraphs(top_rank, advancing_rank)
 
         await self._telegram.send_message(message or "El scoreboard está vacío",
@@ -372,11 +466,12 @@ class ScoreboardNotifier:
     async def _get_scoreboard(self, telegram_user: TelegramUser, search_text: Optional[str]) -> None:
         db.close_old_connections()
 
-        if await self._notify_if_no_scoreboard(telegram_user):
+        now = datetime.utcnow()
+        if await self._notify_if_no_scoreboard(telegram_user, now):
             return
 
         if search_text:
-            await self._notify_scoreboard(telegram_user.chat_id, team_queries={search_text})
+            await self._notify_scoreboard(telegram_user.chat_id, now, team_queries={search_text})
             return
 
         user = await _get_or_create_user(telegram_user.chat_id)
@@ -389,24 +484,39 @@ class ScoreboardNotifier:
                                               telegram_user.chat_id)
             return
 
-        await self._notify_scoreboard(telegram_user.chat_id, team_queries=team_queries, top_query=top_query)
+        await self._notify_scoreboard(telegram_user.chat_id, now, team_queries=team_queries, top_query=top_query)
+
+    async def _follow(self, telegram_user: TelegramUser, follow_texts: List[str]) -> None:
+        # INSERT IGNORE would silently truncate the long ones instead of failing, so reject them up front
+        long_texts = [follow_text for follow_text in follow_texts if len(follow_text) > _MAX_SUBSCRIPTION_LENGTH]
+        if long_texts:
+            await self._telegram.send_message(f"Las subcadenas no pueden tener más de {_MAX_SUBSCRIPTION_LENGTH} "
+                                              f"caracteres: {', '.join(_format_code(text) for text in long_texts)}",
+                                              telegram_user.chat_id)
+            return
 
-    async def _follow(self, telegram_user: TelegramUser, follow_text: str) -> None:
         db.close_old_connections()
 
         user = await _get_or_create_user(telegram_user.chat_id)
-        await ScoreboardSubscription.objects.aget_or_create(user=user, subscription=follow_text)
+        # A single INSERT for all the subscriptions, the unique constraint skips the ones already followed
+        await ScoreboardSubscription.objects.abulk_create(
+            [ScoreboardSubscription(user=user, subscription=follow_text) for follow_text in follow_texts],
+            ignore_conflicts=True,
+        )
 
-        if await self._notify_if_no_scoreboard(telegram_user):
+        now = datetime.utcnow()
+        if await self._notify_if_no_scoreboard(telegram_user, now):
             return
 
-        # Notify of scoreboard, only for the new subscription
-        await self._notify_scoreboard(telegram_user.chat_id, team_queries={follow_text})
+        # Notify of scoreboard, only for the new subscriptions
+        await self._notify_scoreboard(telegram_user.chat_id, now, team_queries=set(follow_texts))
 
     async def _follow_top(self, telegram_user: TelegramUser, top: int) -> None:
         if top <= 0:
             await self._stop_following_top(telegram_user)
             return
+        # Only this many teams are ever notified, and it keeps huge values out of the database
+        top = min(top, _MAX_NOTIFICATION_TEAM_COUNT)
 
         db.close_old_connections()
 
@@ -416,25 +526,37 @@ class ScoreboardNotifier:
         # Add the new top subscription
         await ScoreboardSubscription.objects.aget_or_create(user=user, top=top)
 
-        if await self._notify_if_no_scoreboard(telegram_user):
+        now = datetime.utcnow()
+        if await self._notify_if_no_scoreboard(telegram_user, now):
             return
 
         # Notify of scoreboard, only for the new subscription
-        await self._notify_scoreboard(telegram_user.chat_id, top_query=top)
+        await self._notify_scoreboard(telegram_user.chat_id, now, top_query=top)
 
-    async def _notify_scoreboard_to_all_users(self) -> None:
+    async def _notify_scoreboard_to_all_users(self, now: datetime, batch: _NotificationBatch) -> None:
         # TODO: Improve performance
         for user in await _get_users_with_subscriptions():
             team_queries = await _get_team_subscriptions(user)
             top_query = await _get_top_subscription(user)
-            await self._notify_scoreboard(user.telegram_chat_id, team_queries=team_queries, top_query=top_query)
+            message = await self._get_scoreboard_message(now, team_queries=team_queries, top_query=top_query)
+            batch.add(user.telegram_chat_id, message)
 
     async def _notify_scoreboard(
             self,
             telegram_user_chat_id: int,
+            now: datetime,
             team_queries: Optional[Iterable[str]] = None,
             top_query: Optional[int] = None,
     ) -> None:
+        message = await self._get_scoreboard_message(now, team_queries=team_queries, top_query=top_query)
+        await self._telegram.send_message(message, telegram_user_chat_id)
+
+    async def _get_scoreboard_message(
+            self,
+            now: datetime,
+            team_queries: Optional[Iterable[str]] = None,
+            top_query: Optional[int] = None,
+    ) -> str:
         to_add_teams: List[ParsedBocaScoreboardTeam] = []
         if top_query:
             to_add_teams += _get_top_teams(self._scoreboard, top_query)
@@ -449,9 +571,8 @@ class ScoreboardNotifier:
                 watched_teams.append(team)
 
         current_rank = self._get_current_rank(list(watched_teams)) or "Ningún equipo que sigues fué encontrado"
-        advancing_rank = await self._get_advancing_rank()
-        message = _concat_paragraphs(current_rank, advancing_rank)
-        await self._telegram.send_message(message, telegram_user_chat_id)
+        advancing_rank = await self._get_advancing_rank(now)
+        return _concat_paragraphs(current_rank, advancing_rank)
 
     async def _show_following(self, telegram_user: TelegramUser) -> None:
         db.close_old_connections()
@@ -490,14 +611,7 @@ class ScoreboardNotifier:
     ) -> List[ParsedBocaScoreboardTeam]:
         if not scoreboard:
             return []
-
-        def matches_team(team: ParsedBocaScoreboardTeam) -> bool:
-            for query in queries:
-                if query.lower().strip() in team.name.lower():
-                    return True
-            return False
-
-        return list(filter(matches_team, scoreboard.teams))
+        return [team for team in scoreboard.teams if _matches_any_query(team.name, queries)]
 
     def _get_solved_names(self, team: ParsedBocaScoreboardTeam) -> Set[str]:
         return set(map(lambda p: p.name, filter(lambda p: p.is_solved, team.problems)))
@@ -522,6 +636,12 @@ class ScoreboardNotifier:
         return f"<b>#{team.place}</b> {_format_code(team.name)} " \
                f"resolvió {solved_summary} en {team.total_penalty} minutos"
 
+    def _get_cached_team_summary(self, team: ParsedBocaScoreboardTeam) -> str:
+        summary = self._team_summaries.get(team.name)
+        if summary is None:
+            summary = self._get_team_summary(team)
+        return summary
+
     def _get_current_rank(self, teams: List[ParsedBocaScoreboardTeam]) -> str:
         warning = ""
         if len(teams) > _MAX_NOTIFICATION_TEAM_COUNT:
@@ -529,11 +649,11 @@ class ScoreboardNotifier:
                        f" equipos de los {len(teams)} encontrados:\n\n")
             teams = teams[:_MAX_NOTIFICATION_TEAM_COUNT]
 
-        team_rank = "\n".join(map(self._get_team_summary, teams))
+        team_rank = "\n".join(map(self._get_cached_team_summary, teams))
         return f"{warning}{team_rank}"
 
-    async def _get_advancing_rank(self) -> str:
-        contest = await _get_current_contest()
+    async def _get_advancing_rank(self, now: datetime) -> str:
+        contest = await _get_current_contest(now)
         max_to_advance = contest.max_teams_to_advance
         if not max_to_advance:
             return ''
@@ -555,11 +675,11 @@ class ScoreboardNotifier:
                 if len(teams) == max_to_advance:
                     break
 
-        team_summaries = "\n".join(map(self._get_team_summary, teams))
+        team_summaries = "\n".join(map(self._get_cached_team_summary, teams))
         return f'Los siguientes {len(teams)} equipos se espera que avancen a la siguiente etapa:\n{team_summaries}'
 
-    def _get_solved_diff_summary(self, old_team: ParsedBocaScoreboardTeam, new_team: ParsedBocaScoreboardTeam) -> str:
-        solved_problems = self._get_solved_names(new_team).difference(self._get_solved_names(old_team))
+    def _get_solved_diff_summary(self, old_solved_names: FrozenSet[str], new_team: ParsedBocaScoreboardTeam) -> str:
+        solved_problems = self._get_solved_names(new_team).difference(old_solved_names)
         solved_names = self._solved_as_str(solved_problems)
         if not solved_problems:
             return ''
@@ -571,74 +691,76 @@ class ScoreboardNotifier:
             desc = f"{len(solved_problems)} problemas {solved_names}"
         return f"{desc}, llegando a un total de <b>{new_team.total_solved}</b> problemas resueltos"
 
-    def _get_rank_update(
+    def _get_rank_updates(
             self,
-            old_teams: List[ParsedBocaScoreboardTeam],
+            old_team_states: Dict[str, _TeamState],
             new_teams: List[ParsedBocaScoreboardTeam],
             contest: Contest,
-    ) -> str:
-        teams: Dict[str, ParsedBocaScoreboardTeam] = {t.name: t for t in old_teams}
-        updates = []
-        now = datetime.utcnow()
+            now: datetime,
+    ) -> Dict[str, str]:
+        """Returns the update of each team that changed, keyed by team name and in scoreboard order."""
+        updates: Dict[str, str] = {}
         for new_team in new_teams:
-            if new_team.name not in teams:
-                if old_teams or contest.starts_at >= now - timedelta(minutes=15):
-                    # Only notify of appearance when there were previous parsings (old_teams) or the contest just begun
-                    updates.append(f"El equipo {_format_code(new_team.name)} apareció en el scoreboard")
+            if new_team.name not in old_team_states:
+                if old_team_states or contest.starts_at >= now - timedelta(minutes=15):
+                    # Only notify of appearance when there were previous parsings or the contest just begun
+                    updates[new_team.name] = f"El equipo {_format_code(new_team.name)} apareció en el scoreboard"
                 continue
 
-            old_team = teams[new_team.name]
+            old_team = old_team_states[new_team.name]
             if _USE_NEW_NOTIFICATION_FORMAT:
-                solved_problems = self._get_solved_names(new_team).difference(
-                    self._get_solved_names(old_team)
-                )
+                solved_problems = self._get_solved_names(new_team).difference(old_team.solved_names)
                 if solved_problems:
                     solved_names = ",".join(sorted(solved_problems))
                     update = f"{_format_code(new_team.name)} | {solved_names} -> {new_team.total_solved} AC ({new_team.total_penalty}) | #{old_team.place} -> #{new_team.place}"
-                    updates.append(update)
+                    updates[new_team.name] = update
             else:
-                solved_diff_summary = self._get_solved_diff_summary(old_team, new_team)
+                solved_diff_summary = self._get_solved_diff_summary(old_team.solved_names, new_team)
                 if solved_diff_summary:
                     update = f"El equipo {_format_code(new_team.name)} resolvió {solved_diff_summary}, y "
                     if old_team.place == new_team.place:
                         update += f"quedándose en el mismo lugar <b>#{old_team.place}</b>"
                     else:
                         update += f"cambiando del lugar #{old_team.place} al <b>#{new_team.place}</b>"
-                    updates.append(update)
+                    updates[new_team.name] = update
+
+        return updates
 
-        return "\n".join(updates)
+    async def _notify_rank_updates(self, contest: Contest, now: datetime, batch: _NotificationBatch) -> None:
+        # Diff the whole scoreboard once, then each user only looks for the teams they follow among the changes
+        rank_updates = self._get_rank_updates(self._previous_team_states or {}, self._scoreboard.teams, contest, now)
 
-    async def _notify_rank_updates(self, contest: Contest) -> None:
         # TODO: Improve performance
         for user in await _get_users_with_subscriptions():
             team_queries = await _get_team_subscriptions(user)
             rank_update = ""
-            if team_queries:
-                previous_teams = self._filter_teams(self._previous_scoreboard, team_queries)
-                teams = self._filter_teams(self._scoreboard, team_queries)
-                rank_update = self._get_rank_update(previous_teams, teams, contest)
+            if team_queries and rank_updates:
+                rank_update = "\n".join(
+                    update
+                    for team_name, update in rank_updates.items()
+                    if _matches_any_query(team_name, team_queries)
+                )
 
             top_update = ""
             # Without a previous scoreboard, there is no Top update, as it either just begun,
             # or the service got restarted
-            if self._previous_scoreboard:
+            if self._previous_team_states is not None:
                 top_query = await _get_top_subscription(user)
                 if top_query:
-                    previous_top = _get_top_teams(self._previous_scoreboard, top_query)
                     current_top = _get_top_teams(self._scoreboard, top_query)
                     # Only check the order to see if the top has changed
-                    previous_top_team_names = [team.name for team in previous_top]
+                    previous_top_team_names = _get_top_team_names(self._previous_team_states, top_query)
                     current_top_team_names = [team.name for team in current_top]
                     if previous_top_team_names != current_top_team_names:
                         top_update = f"El top {top_query} ha cambiado:\n{self._get_current_rank(current_top)}"
 
             message = "\n\n".join([rank_update, top_update]).strip()
             if message:
-                await self._telegram.send_message(message, user.telegram_chat_id)
+                batch.add(user.telegram_chat_id, message)
 
-    async def _notify_all_subscribed_users(self, message: str) -> None:
+    async def _notify_all_subscribed_users(self, message: str, batch: _NotificationBatch) -> None:
         for user in await _get_users_with_subscriptions():
-            await self._telegram.send_message(message, user.telegram_chat_id)
+            batch.add(user.telegram_chat_id, message)
 
     async def _stop_all(self, telegram_user: TelegramUser) -> None:
         db.close_old_connections()
@@ -658,7 +780,7 @@ class ScoreboardNotifier:
             await self._telegram.send_developer_message(f'Invalid command. Options: {valid_commands}')
             return
 
-        contest = await _get_current_contest()
+        contest = await _get_current_contest(datetime.utcnow())
         if not contest:
             await self._telegram.send_developer_message('No contest is running')
             return
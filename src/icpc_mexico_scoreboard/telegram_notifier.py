@@ -1,34 +1,69 @@
 import asyncio
+import functools
 import html
 import json
 import logging
 import traceback
+from collections import Counter
 from dataclasses import dataclass
-from typing import Optional, Callable, Awaitable, List, Any
+from typing import Optional, Callable, Awaitable, List, Any, Dict, Tuple
 
 import environ
 import telegram.error
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton, BotCommand
 from telegram.constants import ParseMode
-from telegram.ext import Application, CommandHandler, ContextTypes, CallbackQueryHandler
+from telegram.ext import Application, CommandHandler, ContextTypes, CallbackQueryHandler, AIORateLimiter
 
 logger = logging.getLogger(__name__)
 env = environ.Env()
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class TelegramUser:
     chat_id: int
 
     @staticmethod
     def from_update(update: Update) -> 'TelegramUser':
-        return TelegramUser(chat_id=update.effective_chat.id)
+        return _get_telegram_user(update.effective_chat.id)
+
+
+@functools.lru_cache(maxsize=4096)
+def _get_telegram_user(chat_id: int) -> TelegramUser:
+    # Users are immutable, so reuse the same instance for every update of a chat
+    return TelegramUser(chat_id=chat_id)
+
+
+@dataclass(frozen=True, slots=True)
+class _OutgoingMessage:
+    chat_id: int
+    text: str
+    reply_markup: Optional[InlineKeyboardMarkup] = None
+
+
+@dataclass(frozen=True, slots=True)
+class _Config:
+    token: str
+    developer_chat_id: int
+    # Empty when Telegram should be polled for updates instead
+    webhook_url: str
+    webhook_port: int
+
+
+@functools.cache
+def _config() -> _Config:
+    # Read the environment once, the first time it's needed, instead of on import or on every use
+    return _Config(
+        token=env("TELEGRAM_BOT_TOKEN"),
+        developer_chat_id=env.int("TELEGRAM_DEVELOPER_CHAT_ID"),
+        webhook_url=env("TELEGRAM_WEBHOOK_URL", default=""),
+        webhook_port=env.int("TELEGRAM_WEBHOOK_PORT", default=8443),
+    )
 
 
 _GetStatusCallback = Callable[[TelegramUser], Awaitable[None]]
 _GetTopCallback = Callable[[TelegramUser, Optional[int]], Awaitable[None]]
 _GetScoreboardCallback = Callable[[TelegramUser, Optional[str]], Awaitable[None]]
-_FollowCallback = Callable[[TelegramUser, str], Awaitable[None]]
+_FollowCallback = Callable[[TelegramUser, List[str]], Awaitable[None]]
 _ShowFollowingCallback = Callable[[TelegramUser], Awaitable[None]]
 _StopFollowingCallback = Callable[[TelegramUser, str], Awaitable[None]]
 _FollowTopCallback = Callable[[TelegramUser, int], Awaitable[None]]
@@ -36,15 +71,127 @@ _StopFollowingTopCallback = Callable[[TelegramUser], Awaitable[None]]
 _StopAllCallback = Callable[[TelegramUser], Awaitable[None]]
 _AdminCallback = Callable[[str], Awaitable[None]]
 
-_DEVELOPER_CHAT_ID = int(env("TELEGRAM_DEVELOPER_CHAT_ID"))
+_WEBHOOK_LISTEN_ADDRESS = "0.0.0.0"
 _MESSAGE_SIZE_LIMIT = 4096
+_TRUNCATED_MESSAGE_SUFFIX = "..."
+# Only the innermost frames of a traceback fit in a message, and they are the most useful ones
+_MAX_TRACEBACK_FRAMES = 10
+_UPDATE_DUMP_SIZE_LIMIT = 2048
+# Retries of a message after Telegram asks us to wait, the rate limiter already sticks to the documented limits
+_MAX_SEND_RETRIES = 3
+# Be patient with Telegram during bursts instead of failing with the library's short defaults
+_POOL_TIMEOUT_SECONDS = 20
+_CONNECT_TIMEOUT_SECONDS = 10
+_READ_TIMEOUT_SECONDS = 20
+# Time to wait for more messages to the same chat, so they are sent as a single one
+_SEND_DEBOUNCE_SECONDS = 0.2
+_COALESCED_MESSAGE_SEPARATOR = "\n\n"
+
+
+_BOT_COMMANDS = (
+    BotCommand("estado", "Entérate del estado actual del scoreboard"),
+    BotCommand("top", "Entérate del top del scoreboard"),
+    BotCommand("scoreboard", "Entérate del scoreboard de tus equipos"),
+    BotCommand("seguir", "Comienza a seguir equipos"),
+    BotCommand("seguirtop", "Enteráte de cambios en el top"),
+    BotCommand("dejar", "Deja de seguir equipos"),
+    BotCommand("dejartop", "Deja de seguir el top de los equipos"),
+    BotCommand("alto", "Detén todas las notificaciones"),
+    BotCommand("ayuda", "Muestra la ayuda sobre los comandos"),
+)
+
+_START_HTML = '''¡Hola! Soy un bot <b>no oficial</b> que puede ayudarte a mantenerte informado sobre el scoreboard del ICPC México.
+
+Dá click en <a href="/ayuda">/ayuda</a> para aprender a usarme.
+'''
+
+_HELP_HTML = '''
+<a href="/estado">/estado</a> - Entérate del estado actual del scoreboard.
+<a href="/top">/top</a> - Entérate del top 10 del scoreboard, agrega un entero para especificar cuántos equipos quieres ver. Por ejemplo, <code>/top 5</code>.
+<a href="/scoreboard">/scoreboard</a> - Entérate del scoreboard filtrado por los equipos que estás siguiendo. Especifica una subcdena si quieres saber sobre algunos equipos solamente, y no los que sigues, por ejemplo, <code>/scoreboard itsur</code>.
+<a href="/seguir">/seguir</a> - Comienza a seguir equipos cuyo nombre tengan la subcadena que especifiques, te notificaremos cuando estos equipos resuelvan un problema. Por ejemplo, <code>/seguir Culiacan</code>. Escribe una subcadena por línea para seguir varias a la vez.
+<a href="/seguirtop">/seguirtop</a> - Comienza a seguir el top de los equipos que especifiques, te notificaremos cuando haya algún cambio en dicho top. Por ejemplo, <code>/seguirtop 3'</code>.
+<a href="/dejar">/dejar</a> - Úsalo cuando quieras dejar de seguir a algunos equipos, sólo da click en la subcadena que quieras dejar de seguir.
+<a href="/dejartop">/dejartop</a> - Úsalo cuando quieras dejar de seguir al top de equipos que sigues.
+<a href="/alto">/alto</a> - Deja de seguir a todos los equipos y evita que el bot te siga notificando.
+'''
 
 
 def _get_command_args(message: str) -> Optional[str]:
-    separator = message.find(' ')
-    if separator < 0:
+    # Split at any whitespace, as the arguments may start on the line after the command
+    parts = message.split(maxsplit=1)
+    if len(parts) < 2:
         return None
-    return message[separator:].strip() or None
+    return parts[1].strip() or None
+
+
+def _parse_int(text: Optional[str]) -> Optional[int]:
+    # Check the digits up front, allowing a sign like int() does, instead of catching its ValueError
+    if text and (text[1:] if text[0] in '+-' else text).isdecimal():
+        return int(text)
+    return None
+
+
+def _cut_html(text: str, size: int) -> Tuple[str, str]:
+    """Cuts the HTML text to the size without splitting a tag or entity, returning it and the tags to close."""
+    text = text[:size]
+    # Drop any tag or entity that got cut in half
+    last_tag_start = text.rfind('<')
+    if last_tag_start > text.rfind('>'):
+        text = text[:last_tag_start]
+    last_entity_start = text.rfind('&')
+    if last_entity_start > text.rfind(';'):
+        text = text[:last_entity_start]
+
+    open_tags: List[str] = []
+    tag_start = text.find('<')
+    while tag_start >= 0:
+        tag_end = text.find('>', tag_start)
+        tag = text[tag_start + 1:tag_end]
+        if tag.startswith('/'):
+            if open_tags:
+                open_tags.pop()
+        else:
+            # Ignore the attributes, like in <a href="...">
+            open_tags.append(tag.split(' ', 1)[0])
+        tag_start = text.find('<', tag_end)
+
+    closing_tags = "".join(f"</{tag}>" for tag in reversed(open_tags))
+    return text, closing_tags
+
+
+def _truncate_html(text: str, limit: int) -> str:
+    """Truncates the HTML text to the limit, closing the tags left open so Telegram can still parse it."""
+    size = limit - len(_TRUNCATED_MESSAGE_SUFFIX)
+    while True:
+        truncated, closing_tags = _cut_html(text, size)
+        if len(truncated) + len(_TRUNCATED_MESSAGE_SUFFIX) + len(closing_tags) <= limit:
+            return f"{truncated}{_TRUNCATED_MESSAGE_SUFFIX}{closing_tags}"
+        size -= len(closing_tags)
+
+
+@functools.lru_cache(maxsize=1024)
+def _get_following_markup(subscriptions: Tuple[str, ...]) -> InlineKeyboardMarkup:
+    # Markups are immutable, so the same one can be sent to everyone following the same subscriptions
+    keyboard = [[InlineKeyboardButton(subscription, callback_data=subscription)] for subscription in subscriptions]
+    return InlineKeyboardMarkup(keyboard)
+
+
+def _coalesce_messages(messages: List[_OutgoingMessage]) -> List[List[_OutgoingMessage]]:
+    """Groups the messages by chat, joining consecutive texts while they fit in a message and keeping their order."""
+    chat_messages: Dict[int, List[_OutgoingMessage]] = {}
+    for message in messages:
+        coalesced = chat_messages.setdefault(message.chat_id, [])
+        last = coalesced[-1] if coalesced else None
+        if (last
+                and not last.reply_markup
+                and not message.reply_markup
+                and len(last.text) + len(_COALESCED_MESSAGE_SEPARATOR) + len(message.text) <= _MESSAGE_SIZE_LIMIT):
+            coalesced[-1] = _OutgoingMessage(
+                chat_id=message.chat_id, text=f"{last.text}{_COALESCED_MESSAGE_SEPARATOR}{message.text}")
+        else:
+            coalesced.append(message)
+    return list(chat_messages.values())
 
 
 class TelegramNotifier:
@@ -59,6 +206,11 @@ class TelegramNotifier:
     _stop_following_top_callback: Optional[_StopFollowingTopCallback]
     _stop_all_callback: Optional[_StopAllCallback]
     _admin_callback: Optional[_AdminCallback]
+    # Messages waiting to be sent, so bursts of notifications don't block whoever sends them
+    _outbox: Optional["asyncio.Queue[_OutgoingMessage]"]
+    _send_worker_task: Optional[asyncio.Task]
+    # Last sending task of each chat, so the next one waits for it and the chat receives its messages in order
+    _chat_send_tasks: Dict[int, asyncio.Task]
 
     async def start_running(self,
                             _get_status_callback: _GetStatusCallback,
@@ -73,8 +225,16 @@ class TelegramNotifier:
                             admin_callback: _AdminCallback,
                             ) -> None:
 
-        token = env("TELEGRAM_BOT_TOKEN")
-        self._app = Application.builder().token(token).concurrent_updates(True).build()
+        self._app = (
+            Application.builder()
+            .token(_config().token)
+            .concurrent_updates(True)
+            .rate_limiter(AIORateLimiter(max_retries=_MAX_SEND_RETRIES))
+            .pool_timeout(_POOL_TIMEOUT_SECONDS)
+            .connect_timeout(_CONNECT_TIMEOUT_SECONDS)
+            .read_timeout(_READ_TIMEOUT_SECONDS)
+            .build()
+        )
 
         self._app.add_handler(CommandHandler("estado", self._get_status))
         self._app.add_handler(CommandHandler("top", self._get_top))
@@ -103,25 +263,40 @@ class TelegramNotifier:
         self._stop_all_callback = stop_all_callback
         self._admin_callback = admin_callback
 
+        self._outbox = asyncio.Queue()
+        self._chat_send_tasks = {}
+        self._send_worker_task = asyncio.create_task(self._send_worker())
+
         await self._app.initialize()
-        commands = [
-            BotCommand("estado", "Entérate del estado actual del scoreboard"),
-            BotCommand("top", "Entérate del top del scoreboard"),
-            BotCommand("scoreboard", "Entérate del scoreboard de tus equipos"),
-            BotCommand("seguir", "Comienza a seguir equipos"),
-            BotCommand("seguirtop", "Enteráte de cambios en el top"),
-            BotCommand("dejar", "Deja de seguir equipos"),
-            BotCommand("dejartop", "Deja de seguir el top de los equipos"),
-            BotCommand("alto", "Detén todas las notificaciones"),
-            BotCommand("ayuda", "Muestra la ayuda sobre los comandos"),
-        ]
-        await self._app.bot.set_my_commands(commands)
-
-        await self._app.updater.start_polling()
-        # Start it up async
-        await asyncio.ensure_future(self._app.start())
+        # Both are independent requests to Telegram, so make them at the same time
+        await asyncio.gather(self._update_bot_commands(), self._start_receiving_updates())
+        await self._app.start()
+
+    async def _update_bot_commands(self) -> None:
+        # The commands rarely change, so save the request to set them when Telegram already has them
+        if await self._app.bot.get_my_commands() != _BOT_COMMANDS:
+            await self._app.bot.set_my_commands(_BOT_COMMANDS)
+
+    async def _start_receiving_updates(self) -> None:
+        config = _config()
+        if config.webhook_url:
+            # Telegram pushes the updates to us, using the token as the path so only Telegram knows it
+            await self._app.updater.start_webhook(
+                listen=_WEBHOOK_LISTEN_ADDRESS,
+                port=config.webhook_port,
+                url_path=config.token,
+                webhook_url=f"{config.webhook_url.rstrip('/')}/{config.token}",
+            )
+        else:
+            # Without a public URL, like when developing, ask Telegram for updates
+            await self._app.updater.start_polling()
 
     async def stop_running(self) -> None:
+        if self._send_worker_task:
+            if not self._send_worker_task.done():
+                # Send what is already queued before stopping the worker, instead of dropping it
+                await self._outbox.join()
+            self._send_worker_task.cancel()
         if self._app:
             await self._app.shutdown()
 
@@ -129,14 +304,7 @@ class TelegramNotifier:
         await self._get_status_callback(TelegramUser.from_update(update))
 
     async def _get_top(self, update: Update, _: ContextTypes.DEFAULT_TYPE) -> None:
-        top_n_text = _get_command_args(update.message.text)
-        top_n = None
-        if top_n_text:
-            try:
-                top_n = int(top_n_text)
-            except ValueError:
-                pass
-
+        top_n = _parse_int(_get_command_args(update.message.text))
         await self._get_top_callback(TelegramUser.from_update(update), top_n)
 
     async def _get_scoreboard(self, update: Update, _: ContextTypes.DEFAULT_TYPE) -> None:
@@ -148,17 +316,12 @@ class TelegramNotifier:
         if not follow_text:
             await update.message.reply_html('Especifica una subcadena después de <code>/seguir</code>')
             return
-        await self._follow_callback(TelegramUser.from_update(update), follow_text)
+        # Follow many substrings at once by writing one per line
+        follow_texts = [line.strip() for line in follow_text.splitlines() if line.strip()]
+        await self._follow_callback(TelegramUser.from_update(update), follow_texts)
 
     async def _follow_top(self, update: Update, _: ContextTypes.DEFAULT_TYPE) -> None:
-        top_n_text = _get_command_args(update.message.text)
-        top_n = None
-        if top_n_text:
-            try:
-                top_n = int(top_n_text)
-            except ValueError:
-                pass
-            
+        top_n = _parse_int(_get_command_args(update.message.text))
         if not top_n:
             await update.message.reply_html('Especifica un entero después de <code>/seguirtop</code>')
             return
@@ -168,16 +331,9 @@ class TelegramNotifier:
         await self._show_following_callback(TelegramUser.from_update(update))
 
     async def show_following(self, subscriptions: List[str], chat_id: int) -> None:
-        keyboard = [[InlineKeyboardButton(subscription, callback_data=subscription)] for subscription in subscriptions]
-        markup = InlineKeyboardMarkup(keyboard)
-        try:
-            await self._app.bot.send_message(
-                chat_id=chat_id,
-                text="Elige lo que deseas dejar de seguir:",
-                reply_markup=markup,
-            )
-        except Exception:
-            logger.exception("Could not send Telegram message")
+        markup = _get_following_markup(tuple(subscriptions))
+        self._outbox.put_nowait(
+            _OutgoingMessage(chat_id=chat_id, text="Elige lo que deseas dejar de seguir:", reply_markup=markup))
 
     async def _stop_following(self, update: Update, _: ContextTypes.DEFAULT_TYPE) -> None:
         unfollow_text = update.callback_query.data
@@ -187,12 +343,7 @@ class TelegramNotifier:
         await self._stop_following_top_callback(TelegramUser.from_update(update))
 
     async def _start(self, update: Update, _: ContextTypes.DEFAULT_TYPE) -> None:
-        await update.message.reply_html(
-            '''¡Hola! Soy un bot <b>no oficial</b> que puede ayudarte a mantenerte informado sobre el scoreboard del ICPC México.
-        
-Dá click en <a href="/ayuda">/ayuda</a> para aprender a usarme.
-            '''
-        )
+        await update.message.reply_html(_START_HTML)
 
     async def _stop_all(self, update: Update, _: ContextTypes.DEFAULT_TYPE) -> None:
         await self._stop_all_callback(TelegramUser.from_update(update))
@@ -200,28 +351,18 @@ Dá click en <a href="/ayuda">/ayuda</a> para aprender a usarme.
     async def _admin(self, update: Update, _: ContextTypes.DEFAULT_TYPE) -> None:
         user = TelegramUser.from_update(update)
         text = _get_command_args(update.message.text) or ''
-        if user.chat_id != _DEVELOPER_CHAT_ID:
-            await self.send_developer_message(f'User {user.chat_id} tried to run an admin command: {text}')
+        if user.chat_id != _config().developer_chat_id:
+            await self.send_developer_message(
+                f'User {user.chat_id} tried to run an admin command: {html.escape(text, quote=False)}')
             return
 
         await self._admin_callback(text)
 
     async def _help(self, update: Update, _: ContextTypes.DEFAULT_TYPE) -> None:
-        await update.message.reply_html(
-            '''
-<a href="/estado">/estado</a> - Entérate del estado actual del scoreboard.
-<a href="/top">/top</a> - Entérate del top 10 del scoreboard, agrega un entero para especificar cuántos equipos quieres ver. Por ejemplo, <code>/top 5</code>.
-<a href="/scoreboard">/scoreboard</a> - Entérate del scoreboard filtrado por los equipos que estás siguiendo. Especifica una subcdena si quieres saber sobre algunos equipos solamente, y no los que sigues, por ejemplo, <code>/scoreboard itsur</code>.
-<a href="/seguir">/seguir</a> - Comienza a seguir equipos cuyo nombre tengan la subcadena que especifiques, te notificaremos cuando estos equipos resuelvan un problema. Por ejemplo, <code>/seguir Culiacan</code>.
-<a href="/seguirtop">/seguirtop</a> - Comienza a seguir el top de los equipos que especifiques, te notificaremos cuando haya algún cambio en dicho top. Por ejemplo, <code>/seguirtop 3'</code>.
-<a href="/dejar">/dejar</a> - Úsalo cuando quieras dejar de seguir a algunos equipos, sólo da click en la subcadena que quieras dejar de seguir.
-<a href="/dejartop">/dejartop</a> - Úsalo cuando quieras dejar de seguir al top de equipos que sigues.
-<a href="/alto">/alto</a> - Deja de seguir a todos los equipos y evita que el bot te siga notificando.
-            '''
-        )
+        await update.message.reply_html(_HELP_HTML)
 
     async def send_developer_message(self, text: str) -> None:
-        await self.send_message(f"**ADMIN**: {text}", _DEVELOPER_CHAT_ID)
+        await self.send_message(f"<b>ADMIN</b>: {text}", _config().developer_chat_id)
 
     async def send_message(self, text: str, chat_id: int) -> None:
         if not text.strip():
@@ -230,14 +371,64 @@ Dá click en <a href="/ayuda">/ayuda</a> para aprender a usarme.
 
         if len(text) > _MESSAGE_SIZE_LIMIT:
             logger.debug(f"Shortening long message from {len(text)} to {_MESSAGE_SIZE_LIMIT} characters")
-            text = f"{text[:_MESSAGE_SIZE_LIMIT - 3]}..."
-
+            text = _truncate_html(text, _MESSAGE_SIZE_LIMIT)
+
+        self._outbox.put_nowait(_OutgoingMessage(chat_id=chat_id, text=text))
+
+    async def _send_worker(self) -> None:
+        while True:
+            messages = [await self._outbox.get()]
+            await asyncio.sleep(_SEND_DEBOUNCE_SECONDS)
+            while not self._outbox.empty():
+                messages.append(self._outbox.get_nowait())
+
+            queued_counts = Counter(message.chat_id for message in messages)
+            # Chats don't depend on each other, so send to each one in its own task and leave the pacing to the
+            # rate limiter, without waiting for them, as a slow chat may be held back by the limiter for minutes
+            for chat_messages in _coalesce_messages(messages):
+                chat_id = chat_messages[0].chat_id
+                self._start_sending_to_chat(chat_id, chat_messages, queued_counts[chat_id])
+
+    def _start_sending_to_chat(self, chat_id: int, messages: List[_OutgoingMessage], queued_count: int) -> None:
+        previous_task = self._chat_send_tasks.get(chat_id)
+        task = asyncio.create_task(self._send_to_chat(messages, previous_task, queued_count))
+        self._chat_send_tasks[chat_id] = task
+        task.add_done_callback(functools.partial(self._forget_chat_send_task, chat_id))
+
+    def _forget_chat_send_task(self, chat_id: int, task: asyncio.Task) -> None:
+        if self._chat_send_tasks.get(chat_id) is task:
+            del self._chat_send_tasks[chat_id]
+
+    async def _send_to_chat(self,
+                            messages: List[_OutgoingMessage],
+                            previous_task: Optional[asyncio.Task],
+                            queued_count: int,
+                            ) -> None:
+        try:
+            if previous_task:
+                await asyncio.wait([previous_task])
+            # One at a time, so the chat receives them in order
+            for message in messages:
+                try:
+                    await self._send(message)
+                except Exception:
+                    logger.exception("Unexpected error while sending a Telegram message")
+        finally:
+            for _ in range(queued_count):
+                self._outbox.task_done()
+
+    async def _send(self, message: _OutgoingMessage) -> None:
         try:
-            await self._app.bot.send_message(chat_id=chat_id, text=text, parse_mode=ParseMode.HTML)
+            await self._app.bot.send_message(
+                chat_id=message.chat_id,
+                text=message.text,
+                parse_mode=ParseMode.HTML,
+                reply_markup=message.reply_markup,
+            )
         except telegram.error.Forbidden:
             logger.info("User has blocked us, stopping all notifications to them")
-            self._stop_all_callback(TelegramUser(chat_id=chat_id))
-        except Exception:
+            await self._stop_all_callback(_get_telegram_user(message.chat_id))
+        except telegram.error.TelegramError:
             logger.exception("Could not send Telegram message")
 
     async def _handle_error(self, update: Any, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -245,17 +436,24 @@ Dá click en <a href="/ayuda">/ayuda</a> para aprender a usarme.
         # Log the error before we do anything else, so we can see it even if something breaks.
         logger.error("Exception while handling an update:", exc_info=context.error)
 
-        tb_list = traceback.format_exception(None, context.error, context.error.__traceback__)
+        tb_list = traceback.format_exception(
+            None, context.error, context.error.__traceback__, limit=-_MAX_TRACEBACK_FRAMES)
         tb_string = "".join(tb_list)
 
         # Build the message with some markup and additional information about what happened
-        update_str = update.to_dict() if isinstance(update, Update) else str(update)
-        message = (
-            f"An exception was raised while handling an update\n"
-            f"<pre>update = {html.escape(json.dumps(update_str, indent=2, ensure_ascii=False))}"
-            "</pre>\n\n"
-            f"<pre>context.chat_data = {html.escape(str(context.chat_data))}</pre>\n\n"
-            f"<pre>context.user_data = {html.escape(str(context.user_data))}</pre>\n\n"
-            f"<pre>{html.escape(tb_string)}</pre>"
-        )
+        try:
+            update_str = update.to_dict() if isinstance(update, Update) else str(update)
+            # Cut before escaping, leaving room in the message for the traceback
+            update_json = json.dumps(update_str, ensure_ascii=False)[:_UPDATE_DUMP_SIZE_LIMIT]
+        except Exception:
+            # Reporting the error matters more than a pretty update
+            update_json = repr(update)[:_UPDATE_DUMP_SIZE_LIMIT]
+        # All the details go in a single block, so they are escaped at once
+        details = "\n\n".join([
+            f"update = {update_json}",
+            f"context.chat_data = {context.chat_data}",
+            f"context.user_data = {context.user_data}",
+            tb_string,
+        ])
+        message = f"An exception was raised while handling an update\n<pre>{html.escape(details, quote=False)}</pre>"
         await self.send_developer_message(message)
@@ -3,8 +3,9 @@
 import asyncio
 import os
 
+import django
 import environ
-from django.core.wsgi import get_wsgi_application
+import uvloop
 import google.cloud.logging
 
 
@@ -13,14 +14,19 @@ if __name__ == "__main__":
     env = environ.Env()
     if env.bool("USE_CLOUD_LOGGING"):
         client = google.cloud.logging.Client()
+        # Off GCP this installs a CloudLoggingHandler, whose default transport sends the logs from a background
+        # thread, so the event loop never waits on Cloud Logging
         client.setup_logging()
 
     # Start up Django
     os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings")
-    get_wsgi_application()
+    # Only the ORM is needed, so skip building the WSGI handler
+    django.setup()
 
     # Delay import so Django is set up first
     from icpc_mexico_scoreboard.app import start
+    # The bot mostly waits on sockets, which uvloop handles faster than the default event loop
+    uvloop.install()
     try:
         asyncio.run(start())
     except KeyboardInterrupt:
@@ -15,11 +15,17 @@ DATABASES = {
         "NAME": env("DATABASE_NAME"),
         "USER": env("DATABASE_USER"),
         "PASSWORD": env("DATABASE_PASSWORD"),
+        "CONN_MAX_AGE": 10*60,  # 10 minutes
+        # Check reused connections before using them, so a dropped one is replaced instead of failing a query
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            # Team names can have any character, including emojis
+            "charset": "utf8mb4",
+            "init_command": "SET sql_mode='STRICT_TRANS_TABLES'",
+        },
     }
 }
 
-CONN_MAX_AGE = 10*60  # 10 minutes
-
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 INSTALLED_APPS = (